@@ -2,11 +2,15 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
 import fnmatch
+import functools
 import os
+import re
+import stat
 import sys
-from dataclasses import dataclass
-from pathlib import Path
+from collections.abc import Callable
+from dataclasses import dataclass, field
 
 
 DEFAULT_EXCLUDES = [
@@ -31,53 +35,153 @@ DEFAULT_EXCLUDES = [
 ]
 
 
-def _default_source_root(script_path: Path) -> Path:
-    if script_path.parent.name == "scripts":
-        return script_path.parent.parent
-    return script_path.parent
+def _default_source_root(script_dir: str) -> str:
+    if os.path.basename(script_dir) == "scripts":
+        return os.path.dirname(script_dir)
+    return script_dir
 
 
-def _is_excluded(rel_path: Path, patterns: list[str]) -> bool:
-    rel_posix = rel_path.as_posix()
-    for pattern in patterns:
-        if "/" in pattern:
-            if fnmatch.fnmatch(rel_posix, pattern):
-                return True
-            continue
+@dataclass
+class _Excludes:
+    # Component patterns without wildcard characters (the vast majority of
+    # DEFAULT_EXCLUDES), for O(1) tests against a single name.
+    literal: frozenset[str]
+    # The same literals anchored as "(^|/)name(/|$)", so matching them against
+    # a whole relative path is one C-level scan with no component splitting.
+    any_component_re: re.Pattern[str] | None
+    # Wildcard component patterns; matched against individual components.
+    comp_re: re.Pattern[str] | None
+    # '/'-containing patterns; matched against the posix-style relative path.
+    path_re: re.Pattern[str] | None
+    # Specialized per-entry matcher generated for this exact pattern set;
+    # called as match_entry(name, rel_posix) for every directory entry.
+    match_entry: Callable[[str, str], bool]
+
+
+def _generate_entry_matcher(
+    literal: frozenset[str],
+    comp_re: re.Pattern[str] | None,
+    path_re: re.Pattern[str] | None,
+) -> Callable[[str, str], bool]:
+    """Generate a matcher specialized to the configured patterns.
+
+    The pattern set is fixed at startup, so emit a function with only the
+    checks that can actually fire, binding the set and the regex match
+    methods as default arguments (the fastest lookup Python offers). The
+    generic _is_excluded pays those branches and attribute lookups on every
+    entry; the generated one does not.
+    """
+    params = ["name", "rel"]
+    checks = []
+    namespace: dict[str, object] = {}
+    if literal:
+        params.append("_lit=_lit")
+        namespace["_lit"] = literal
+        checks.append("name in _lit")
+    if comp_re is not None:
+        params.append("_comp=_comp")
+        namespace["_comp"] = comp_re.match
+        checks.append("_comp(name) is not None")
+    if path_re is not None:
+        params.append("_path=_path")
+        namespace["_path"] = path_re.match
+        checks.append("_path(rel) is not None")
+
+    source = "def match_entry({}):\n    return {}".format(
+        ", ".join(params), " or ".join(checks) if checks else "False"
+    )
+    # The template above contains no user input; patterns are bound as
+    # objects via default arguments, never interpolated into the source.
+    exec(source, namespace)
+    return namespace["match_entry"]  # type: ignore[return-value]
+
+
+def _compile_excludes(patterns: list[str]) -> _Excludes:
+    """Compile exclude patterns into an _Excludes matcher.
+
+    Patterns containing '/' match the posix-style relative path; all others
+    match any single path component. Each group is folded into a set or a
+    single regex so matching a path is a constant number of C-level checks
+    instead of a Python loop over patterns and components.
+    """
+    literal = frozenset(
+        p for p in patterns if "/" not in p and not any(c in p for c in "*?[")
+    )
+    comp_patterns = [p for p in patterns if "/" not in p and p not in literal]
+    path_patterns = [p for p in patterns if "/" in p]
+    any_component_re = (
+        re.compile("(?:^|/)(?:" + "|".join(map(re.escape, sorted(literal))) + ")(?:/|$)")
+        if literal
+        else None
+    )
+    comp_re = (
+        re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in comp_patterns))
+        if comp_patterns
+        else None
+    )
+    path_re = (
+        re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in path_patterns))
+        if path_patterns
+        else None
+    )
+    return _Excludes(
+        literal,
+        any_component_re,
+        comp_re,
+        path_re,
+        _generate_entry_matcher(literal, comp_re, path_re),
+    )
 
-        for part in rel_path.parts:
-            if fnmatch.fnmatch(part, pattern):
-                return True
 
-    return False
+def _is_excluded(rel_posix: str, excludes: _Excludes) -> bool:
+    if excludes.any_component_re is not None and excludes.any_component_re.search(
+        rel_posix
+    ):
+        return True
 
+    if excludes.path_re is not None and excludes.path_re.match(rel_posix):
+        return True
 
-def _symlink_points_to(target_path: Path, desired_source_abs: Path) -> bool:
-    if not target_path.is_symlink():
-        return False
+    # Wildcard component patterns are the only case that still needs the
+    # path split apart; with the default excludes this is never reached.
+    if excludes.comp_re is not None:
+        comp_match = excludes.comp_re.match
+        for part in rel_posix.split("/"):
+            if comp_match(part):
+                return True
+
+    return False
 
-    try:
-        link_text = os.readlink(target_path)
-    except OSError:
-        return False
 
-    link_path = Path(link_text)
-    if not link_path.is_absolute():
-        link_path = target_path.parent / link_path
+def _ensure_dir(path: str, *, ensured: dict[str, bool], dry_run: bool) -> bool:
+    """Ensure the target directory exists; returns whether it does on disk.
 
-    existing_abs = Path(os.path.abspath(link_path))
-    return existing_abs == desired_source_abs
+    In dry-run mode missing directories are only created virtually (mapped to
+    False in `ensured`), and a child of a virtual directory is known to be
+    virtual too without touching disk — so a dry run against a fresh target
+    costs one stat per pre-existing directory and nothing below that.
+    """
+    exists = ensured.get(path)
+    if exists is not None:
+        return exists
 
+    if dry_run and ensured.get(os.path.dirname(path)) is False:
+        ensured[path] = False
+        return False
 
-def _ensure_parent_dir(path: Path, *, dry_run: bool) -> None:
-    parent = path.parent
-    if parent.exists():
-        if parent.is_dir():
-            return
-        raise RuntimeError(f"Target parent exists and is not a directory: {parent}")
+    if os.path.exists(path):
+        if os.path.isdir(path):
+            ensured[path] = True
+            return True
+        raise RuntimeError(f"Target parent exists and is not a directory: {path}")
 
     if not dry_run:
-        parent.mkdir(parents=True, exist_ok=True)
+        os.makedirs(path, exist_ok=True)
+        ensured[path] = True
+        return True
+
+    ensured[path] = False
+    return False
 
 
 @dataclass
@@ -88,83 +192,321 @@ class _Stats:
     skipped_excluded: int = 0
     conflicts: int = 0
     errors: int = 0
+    # Buffered stdout/stderr lines; each scan appends locally and main()
+    # flushes once at the end. One write syscall instead of a locked,
+    # line-buffered print per file, and no interleaving across workers.
+    out: list[str] = field(default_factory=list)
+    log: list[str] = field(default_factory=list)
+
+    def __iadd__(self, other: _Stats) -> _Stats:
+        self.created += other.created
+        self.updated += other.updated
+        self.already_ok += other.already_ok
+        self.skipped_excluded += other.skipped_excluded
+        self.conflicts += other.conflicts
+        self.errors += other.errors
+        self.out.extend(other.out)
+        self.log.extend(other.log)
+        return self
 
 
 def _iter_top_level_dirs(
-    source_root: Path,
+    source_root: str,
     *,
     only_dirs: list[str] | None,
     include_dot_dirs: bool,
-    exclude_patterns: list[str],
-) -> list[Path]:
+    excludes: _Excludes,
+) -> list[str]:
+    result: list[str] = []
     if only_dirs:
-        dirs = [source_root / d for d in only_dirs]
+        for d in only_dirs:
+            path = os.path.join(source_root, d)
+            name = os.path.basename(os.path.normpath(path))
+            if not include_dot_dirs and name.startswith("."):
+                continue
+            if _is_excluded(name, excludes):
+                continue
+            result.append(path)
     else:
-        dirs = [p for p in source_root.iterdir() if p.is_dir()]
-
-    result: list[Path] = []
-    for p in sorted(dirs, key=lambda x: x.name):
-        if not include_dot_dirs and p.name.startswith("."):
-            continue
-        if _is_excluded(Path(p.name), exclude_patterns):
-            continue
-        result.append(p)
+        # Filter on the name before consulting is_dir(); this prunes .git,
+        # node_modules, etc. without ever touching them, and the surviving
+        # is_dir() answers come from the dirent scandir already read.
+        with os.scandir(source_root) as it:
+            for entry in it:
+                name = entry.name
+                if not include_dot_dirs and name.startswith("."):
+                    continue
+                if _is_excluded(name, excludes):
+                    continue
+                if not entry.is_dir():
+                    continue
+                result.append(entry.path)
+    # Sort the (smaller) filtered list for deterministic processing order.
+    result.sort(key=os.path.basename)
     return result
 
 
 def _link_file(
-    source_file: Path,
-    target_file: Path,
+    source_abs: str,
+    target_dir: str,
+    name: str,
+    rel_link: str,
     *,
+    dir_fd: int,
     force: bool,
     dry_run: bool,
     stats: _Stats,
 ) -> None:
-    desired_source_abs = Path(os.path.abspath(source_file))
+    # All target operations go through dir_fd, so the kernel only resolves
+    # the final component instead of re-walking the full target path per
+    # file. One lstat answers every question about the target: missing,
+    # correct symlink, directory, or something to replace.
+    try:
+        st = os.lstat(name, dir_fd=dir_fd)
+    except OSError:
+        st = None
 
+    if st is None:
+        if dry_run:
+            stats.out.append(f"CREATE {target_dir}{os.sep}{name} -> {source_abs}")
+        else:
+            os.symlink(rel_link, name, dir_fd=dir_fd)
+        stats.created += 1
+        return
+
+    if stat.S_ISLNK(st.st_mode):
+        # We always write relative links of a known form, so a correct link
+        # reads back as exactly the desired text.
+        try:
+            if os.readlink(name, dir_fd=dir_fd) == rel_link:
+                stats.already_ok += 1
+                return
+        except OSError:
+            pass
+    elif stat.S_ISDIR(st.st_mode):
+        stats.conflicts += 1
+        stats.log.append(f"SKIP   {target_dir}{os.sep}{name} (exists as directory)")
+        return
+
+    if not force:
+        stats.conflicts += 1
+        stats.log.append(
+            f"SKIP   {target_dir}{os.sep}{name} (exists; use --force to replace)"
+        )
+        return
+
+    if dry_run:
+        stats.out.append(f"UPDATE {target_dir}{os.sep}{name} -> {source_abs}")
+    else:
+        os.unlink(name, dir_fd=dir_fd)
+        os.symlink(rel_link, name, dir_fd=dir_fd)
+    stats.updated += 1
+
+
+def _link_dir_files(
+    current_dir: str,
+    target_dir: str,
+    names: list[str],
+    rel_link_dir: str,
+    *,
+    force: bool,
+    dry_run: bool,
+    stats: _Stats,
+    ensured: dict[str, bool],
+) -> None:
+    sep = os.sep
     try:
-        _ensure_parent_dir(target_file, dry_run=dry_run)
+        exists = _ensure_dir(target_dir, ensured=ensured, dry_run=dry_run)
     except Exception as exc:
-        stats.errors += 1
-        print(f"ERROR  {target_file}: {exc}", file=sys.stderr)
+        stats.errors += len(names)
+        stats.log.extend(f"ERROR  {target_dir}{sep}{name}: {exc}" for name in names)
         return
 
-    if _symlink_points_to(target_file, desired_source_abs):
-        stats.already_ok += 1
+    if not exists:
+        # Dry run against a directory that would only be created: every file
+        # is a CREATE and there is nothing on disk to compare with.
+        stats.out.extend(
+            f"CREATE {target_dir}{sep}{name} -> {current_dir}{sep}{name}"
+            for name in names
+        )
+        stats.created += len(names)
         return
 
-    target_exists = target_file.exists() or target_file.is_symlink()
-    if target_exists:
-        if target_file.is_dir():
-            stats.conflicts += 1
-            print(f"SKIP   {target_file} (exists as directory)", file=sys.stderr)
-            return
-
-        if not force:
-            stats.conflicts += 1
-            print(f"SKIP   {target_file} (exists; use --force to replace)", file=sys.stderr)
-            return
+    try:
+        dir_fd = os.open(target_dir, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+    except OSError as exc:
+        stats.errors += len(names)
+        stats.log.extend(f"ERROR  {target_dir}{sep}{name}: {exc}" for name in names)
+        return
 
-        if dry_run:
-            print(f"UPDATE {target_file} -> {desired_source_abs}")
-        else:
-            target_file.unlink()
-            rel = os.path.relpath(desired_source_abs, start=target_file.parent)
-            target_file.symlink_to(rel)
-        stats.updated += 1
+    try:
+        for name in names:
+            _link_file(
+                current_dir + sep + name,
+                target_dir,
+                name,
+                rel_link_dir + sep + name,
+                dir_fd=dir_fd,
+                force=force,
+                dry_run=dry_run,
+                stats=stats,
+            )
+    finally:
+        os.close(dir_fd)
+
+
+def _scan(
+    current_dir: str,
+    src_fd: int,
+    rel_posix: str,
+    rel_link_dir: str,
+    *,
+    target_dir: str,
+    excludes: _Excludes,
+    follow_symlinks: bool,
+    visited: set[tuple[int, int]],
+    force: bool,
+    dry_run: bool,
+    stats: _Stats,
+    ensured: dict[str, bool],
+) -> None:
+    # src_fd is an open fd for current_dir, owned by the caller; scanning the
+    # fd (and opening children relative to it below) spares the kernel a full
+    # source-path resolution per directory. current_dir is kept only for
+    # building message/source-path strings.
+    try:
+        it = os.scandir(src_fd)
+    except OSError:
+        # Match os.walk's default of silently skipping unreadable directories.
         return
 
-    if dry_run:
-        print(f"CREATE {target_file} -> {desired_source_abs}")
-    else:
-        rel = os.path.relpath(desired_source_abs, start=target_file.parent)
-        target_file.symlink_to(rel)
-    stats.created += 1
+    # Hoist everything the per-entry loop touches into locals; attribute
+    # lookups in this loop are the main interpreter overhead left.
+    match_entry = excludes.match_entry
+    sep = os.sep
+    rel_prefix = rel_posix + "/" if rel_posix else ""
+    child_link_prefix = os.pardir + sep + rel_link_dir + sep
+    skipped = 0
+    files: list[str] = []
+    subdirs: list[tuple[str, str]] = []
+
+    with it:
+        for entry in it:
+            name = entry.name
+            # Components above us were already vetted when we descended, so
+            # only the new component (and the full path for '/' patterns)
+            # needs checking here.
+            rel = rel_prefix + name
+            if match_entry(name, rel):
+                skipped += 1
+                continue
+
+            if entry.is_dir(follow_symlinks=follow_symlinks):
+                if follow_symlinks and entry.is_symlink():
+                    # Guard against symlink cycles with the (dev, ino) of the
+                    # link target; the DirEntry stat is cached from readdir,
+                    # so this stays cheaper than realpath-ing every entry.
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    key = (st.st_dev, st.st_ino)
+                    if key in visited:
+                        continue
+                    visited.add(key)
+                subdirs.append((rel, name))
+            elif entry.is_file(follow_symlinks=False) or entry.is_symlink():
+                files.append(name)
+
+    if skipped:
+        stats.skipped_excluded += skipped
+
+    # Handle all of this directory's files against one target dir_fd before
+    # descending, so each target directory is ensured and opened exactly once.
+    if files:
+        _link_dir_files(
+            current_dir,
+            target_dir,
+            files,
+            rel_link_dir,
+            force=force,
+            dry_run=dry_run,
+            stats=stats,
+            ensured=ensured,
+        )
+
+    for rel, name in subdirs:
+        try:
+            child_fd = os.open(
+                name, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC, dir_fd=src_fd
+            )
+        except OSError:
+            continue
+        try:
+            _scan(
+                current_dir + sep + name,
+                child_fd,
+                rel,
+                child_link_prefix + name,
+                target_dir=target_dir + sep + name,
+                excludes=excludes,
+                follow_symlinks=follow_symlinks,
+                visited=visited,
+                force=force,
+                dry_run=dry_run,
+                stats=stats,
+                ensured=ensured,
+            )
+        finally:
+            os.close(child_fd)
+
+
+def _process_project(
+    project_dir: str,
+    *,
+    target_root_str: str,
+    excludes: _Excludes,
+    follow_symlinks: bool,
+    force: bool,
+    dry_run: bool,
+) -> _Stats:
+    stats = _Stats()
+    project_src = project_dir
+    target_project_root = os.path.join(
+        target_root_str, os.path.basename(os.path.normpath(project_dir))
+    )
+    try:
+        src_fd = os.open(project_src, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+    except OSError:
+        # Match os.walk's default of silently skipping unreadable directories.
+        return stats
+    try:
+        _scan(
+            project_src,
+            src_fd,
+            "",
+            # Link text from the project's target dir back to its source dir;
+            # the recursion extends it one '..' + component at a time so no
+            # per-file relpath is needed.
+            os.path.relpath(project_src, target_project_root),
+            target_dir=target_project_root,
+            excludes=excludes,
+            follow_symlinks=follow_symlinks,
+            # Per-project sets, so no locking is needed across worker threads.
+            visited=set(),
+            force=force,
+            dry_run=dry_run,
+            stats=stats,
+            ensured={},
+        )
+    finally:
+        os.close(src_fd)
+    return stats
 
 
 def main() -> int:
-    script_path = Path(__file__).resolve()
-    default_source_root = _default_source_root(script_path)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    default_source_root = _default_source_root(script_dir)
 
     parser = argparse.ArgumentParser(
         formatter_class=argparse.RawTextHelpFormatter,
@@ -187,14 +529,12 @@ def main() -> int:
     )
     parser.add_argument(
         "--source-root",
-        type=Path,
         default=default_source_root,
         help=f"Source root (default: {default_source_root}).",
     )
     parser.add_argument(
         "--target-root",
-        type=Path,
-        default=(Path.home() / "potato"),
+        default=os.path.join(os.path.expanduser("~"), "potato"),
         help="Target root (default: ~/potato).",
     )
     parser.add_argument(
@@ -207,6 +547,14 @@ def main() -> int:
         action="store_true",
         help="Replace existing files/symlinks at the target path (never deletes directories).",
     )
+    parser.add_argument(
+        "--follow-symlinks",
+        action="store_true",
+        help=(
+            "Descend into symlinks that point at directories (cycle-safe via a "
+            "visited-inode set) instead of linking the symlink itself."
+        ),
+    )
     parser.add_argument(
         "--include-dot-dirs",
         action="store_true",
@@ -223,12 +571,16 @@ def main() -> int:
     )
     args = parser.parse_args()
 
-    source_root: Path = args.source_root.expanduser().resolve()
-    target_root: Path = args.target_root.expanduser().resolve()
+    # abspath, not resolve()/realpath: normalizing is one string pass, while
+    # realpath stats every component of the chain. The roots only need to be
+    # absolute so the traversal can build everything below by concatenation.
+    source_root = os.path.abspath(os.path.expanduser(args.source_root))
+    target_root = os.path.abspath(os.path.expanduser(args.target_root))
     exclude_patterns: list[str] = list(DEFAULT_EXCLUDES) + list(args.exclude)
+    excludes = _compile_excludes(exclude_patterns)
     only_dirs: list[str] | None = args.dirs or None
 
-    if not source_root.is_dir():
+    if not os.path.isdir(source_root):
         print(f"ERROR: source-root is not a directory: {source_root}", file=sys.stderr)
         return 2
 
@@ -236,56 +588,47 @@ def main() -> int:
         source_root,
         only_dirs=only_dirs,
         include_dot_dirs=bool(args.include_dot_dirs),
-        exclude_patterns=exclude_patterns,
+        excludes=excludes,
     )
     if only_dirs:
-        missing = [d for d in only_dirs if (source_root / d) not in top_level_dirs]
+        missing = [
+            d for d in only_dirs if os.path.join(source_root, d) not in top_level_dirs
+        ]
         for d in missing:
-            if not (source_root / d).exists():
-                print(f"ERROR: missing directory: {source_root / d}", file=sys.stderr)
+            path = os.path.join(source_root, d)
+            if not os.path.exists(path):
+                print(f"ERROR: missing directory: {path}", file=sys.stderr)
             else:
-                print(
-                    f"ERROR: directory excluded by rules: {source_root / d}",
-                    file=sys.stderr,
-                )
+                print(f"ERROR: directory excluded by rules: {path}", file=sys.stderr)
         if missing:
             return 2
 
     stats = _Stats()
-    for project_dir in top_level_dirs:
-        for dirpath, dirnames, filenames in os.walk(project_dir, followlinks=False):
-            current_dir = Path(dirpath)
-            rel_dir = current_dir.relative_to(project_dir)
-
-            pruned_dirnames: list[str] = []
-            for d in dirnames:
-                rel = rel_dir / d
-                if _is_excluded(rel, exclude_patterns):
-                    stats.skipped_excluded += 1
-                    continue
-                pruned_dirnames.append(d)
-            dirnames[:] = pruned_dirnames
-
-            for filename in filenames:
-                rel = rel_dir / filename
-                if _is_excluded(rel, exclude_patterns):
-                    stats.skipped_excluded += 1
-                    continue
-
-                source_file = current_dir / filename
-                if source_file.is_dir():
-                    continue
-                if not (source_file.is_file() or source_file.is_symlink()):
-                    continue
+    process_project = functools.partial(
+        _process_project,
+        target_root_str=target_root,
+        excludes=excludes,
+        follow_symlinks=bool(args.follow_symlinks),
+        force=bool(args.force),
+        dry_run=bool(args.dry_run),
+    )
+    if len(top_level_dirs) > 1:
+        # Independent subtrees, I/O-bound on stat/readdir/symlink syscalls
+        # (which release the GIL), and each project writes to a disjoint
+        # directory under target_root — so threads parallelize cleanly.
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(32, len(top_level_dirs))
+        ) as executor:
+            for project_stats in executor.map(process_project, top_level_dirs):
+                stats += project_stats
+    else:
+        for project_dir in top_level_dirs:
+            stats += process_project(project_dir)
 
-                target_file = target_root / project_dir.name / rel
-                _link_file(
-                    source_file,
-                    target_file,
-                    force=bool(args.force),
-                    dry_run=bool(args.dry_run),
-                    stats=stats,
-                )
+    if stats.out:
+        sys.stdout.write("\n".join(stats.out) + "\n")
+    if stats.log:
+        sys.stderr.write("\n".join(stats.log) + "\n")
 
     print(
         "Done:"